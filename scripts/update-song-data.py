@@ -9,31 +9,93 @@ available).
 """
 
 import os
+import re
 import sys
 import time
 import json
+import asyncio
+import functools
+import random
+import shutil
 import socket
-import imghdr
 import logging
 import subprocess
-import tempfile
+import multiprocessing
 import argparse
 import requests
 import logging.config
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+try:
+    # optional: a lot faster than the json module when saving large JSON files
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # optional: read video durations in-process instead of starting ffprobe for each video
+    import av
+except ImportError:
+    av = None
 
 # Configuration
 VIDEOS_DIR = "videos"
 COVERS_DIR = "covers"
+_COVERS_PATH = Path(COVERS_DIR)
 OUTPUT_JSON = "videos.json"
 EXTRA_METADATA_JSON = "extra_metadata.json"
+PROGRESS_JSONL = "update-song-data.progress.jsonl"
+SPOTDL_CACHE_JSON = "spotdl_cache.json"
+
+# queries without spotdl result are retried after this time (in seconds)
+SPOTDL_NEGATIVE_CACHE_TTL = 7 * 24 * 60 * 60
+
+# number of songs queried with a single spotdl process
+SPOTDL_BATCH_SIZE = 20
+
+# maximum number of spotdl processes started per second and retries if rate limit is hit
+SPOTDL_MAX_RATE = 8
+SPOTDL_MAX_RETRIES = 5
+
+# maximum length of a line printed by spotdl (in bytes), the JSON output contains long lines
+SPOTDL_OUTPUT_LINE_LIMIT = 1024 * 1024
 
 # FIXME this is probably not necessary
-VIDEO_EXTENSIONS = [".mp4", ".avi", ".mkv", ".mov", ".webm", ".flv", ".m4v"]
+VIDEO_EXTENSIONS = frozenset({".mp4", ".avi", ".mkv", ".mov", ".webm", ".flv", ".m4v"})
+
+# only JPG covers are supported by download_cover()
+COVER_EXTENSIONS = frozenset({".jpg"})
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# timeout (in seconds) and read size (in bytes) for cover downloads
+COVER_DOWNLOAD_TIMEOUT = 30
+COVER_CHUNK_SIZE = 64 * 1024
+
+# default number of videos processed concurrently (keep it low to respect Spotify rate limits)
+NUM_WORKERS = 4
 
 LOG_FILE = "update-song-data.log"
 
+# maps base name of a song to the file name of its cover, filled by scan_covers()
+_covers_index: Dict[str, str] = {}
+
+# maps spotdl search query to metadata or {"__miss__": timestamp} if nothing was found
+_spotdl_cache: Dict[str, Dict] = {}
+
+# set by cache_spotdl_result(), the cache is saved once at the end of the run
+_spotdl_cache_changed = False
+
+# start times of the most recent spotdl processes, see throttle_spotdl()
+_spotdl_starts: Deque[float] = deque()
+
+# time.monotonic() until which no spotdl query is started, see pause_spotdl()
+_spotdl_paused_until = 0.0
+
 
 def log_exception(type_, value, traceback):
     logging.error("Uncaught exception:", exc_info=(type_, value, traceback))
@@ -79,40 +141,122 @@ def setup_logging(fname=LOG_FILE):
     logging.config.dictConfig(logging_config)
 
 
+@functools.lru_cache(maxsize=1)
 def check_internet_connection() -> bool:
-    """Check if internet connection is available."""
+    """Check if internet connection is available (checked only once per run)."""
     try:
         # Try to connect to a reliable DNS server
-        socket.create_connection(("8.8.8.8", 53), timeout=5)
-        return True
+        with socket.create_connection(("8.8.8.8", 53), timeout=1.5):
+            return True
     except (socket.timeout, socket.error):
         return False
 
 
-def save_json_files(video_data, extra_metadata):
-    """Save current videos and extra metadata to JSON files."""
-    videos_data = list(video_data.values())
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(videos_data, f, indent=2, ensure_ascii=False)
+def check_dependencies(no_internet: bool) -> bool:
+    """Check if required command line tools are installed (without starting them)."""
+    required = ["ffprobe"] if no_internet else ["ffprobe", "spotdl"]
 
-    with open(EXTRA_METADATA_JSON, "w", encoding="utf-8") as f:
-        json.dump(extra_metadata, f, indent=2, ensure_ascii=False)
+    missing = []
+    for tool in required:
+        tool_path = shutil.which(tool)
+        if tool_path is None:
+            missing.append(tool)
+        else:
+            logging.debug(f"✓ {tool} found at {tool_path}")
+
+    if missing:
+        logging.error(f"Required tools not found on PATH: {', '.join(missing)}")
+
+    return not missing
+
+
+def read_json(fname: str):
+    """Read a JSON file, parsed with orjson if installed."""
+    with open(fname, "rb") as f:
+        content = f.read()
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def write_json(fname: str, data, indent: bool = True):
+    """Write data to a JSON file atomically: a killed script never leaves a truncated file.
+
+    Files which are not meant to be read by humans are written without indentation (indent=False).
+
+    """
+    tmp_fname = f"{fname}.tmp"
+    if orjson is not None:
+        content = orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    elif indent:
+        content = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    else:
+        content = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    with open(tmp_fname, "wb") as f:
+        f.write(content)
+    os.replace(tmp_fname, fname)
+
+
+def save_json_files(video_data, extra_metadata: Optional[Dict]):
+    """Save current videos and extra metadata (unless it is None) to JSON files."""
+    write_json(OUTPUT_JSON, list(video_data.values()))
+    if extra_metadata is not None:
+        # not used by the web app, only read by this script
+        write_json(EXTRA_METADATA_JSON, extra_metadata, indent=False)
     logging.info("Json files saved to disk...")
 
 
-def load_existing_data() -> Tuple[List[Dict], Dict]:
-    """Load existing videos.json and extra_metadata.json files."""
+def append_progress(progress_file, base_name: str, video_entry: Dict, extra_metadata_entry):
+    """Append the result of a single video to the progress file (for resume capability)."""
+    record = {"filename": base_name, "entry": video_entry, "extra": extra_metadata_entry}
+    progress_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    progress_file.flush()
+
+
+def replay_progress(video_data, extra_metadata, video_stems) -> int:
+    """Apply results of an interrupted run stored in PROGRESS_JSONL, returns number of entries.
+
+    Results of videos which are not in video_stems (deleted since the interrupted run) are dropped.
+
+    """
+    if not os.path.exists(PROGRESS_JSONL):
+        return 0
+
+    restored_count = 0
+    with open(PROGRESS_JSONL, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # the last line is incomplete if the script was killed while writing it
+                logging.warning(f"Ignoring incomplete line in {PROGRESS_JSONL}")
+                break
+
+            if record["filename"] not in video_stems:
+                logging.info(f"Ignoring result of removed video {record['filename']}")
+                continue
+
+            video_data[record["filename"]] = record["entry"]
+            if record["extra"] is not None:
+                extra_metadata[record["filename"]] = record["extra"]
+            restored_count += 1
+
+    logging.info(f"✓ Restored {restored_count} entries from interrupted run")
+
+    return restored_count
+
+
+def load_existing_data(with_extra_metadata: bool = True) -> Tuple[List[Dict], Dict]:
+    """Load existing videos.json and extra_metadata.json (only if with_extra_metadata is set)."""
     existing_videos = []
     existing_extra_metadata = {}
 
     if os.path.exists(OUTPUT_JSON):
-        with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
-            existing_videos = json.load(f)
+        existing_videos = read_json(OUTPUT_JSON)
         logging.info(f"✓ Loaded {len(existing_videos)} existing video entries")
 
-    if os.path.exists(EXTRA_METADATA_JSON):
-        with open(EXTRA_METADATA_JSON, "r", encoding="utf-8") as f:
-            existing_extra_metadata = json.load(f)
+    if with_extra_metadata and os.path.exists(EXTRA_METADATA_JSON):
+        existing_extra_metadata = read_json(EXTRA_METADATA_JSON)
         logging.info(f"✓ Loaded extra metadata for {len(existing_extra_metadata)} videos")
 
     return existing_videos, existing_extra_metadata
@@ -120,93 +264,359 @@ def load_existing_data() -> Tuple[List[Dict], Dict]:
 
 def get_video_files() -> List[Path]:
     """Get all video files from the videos directory."""
-    videos_path = Path(VIDEOS_DIR)
-    video_files = []
-    for ext in VIDEO_EXTENSIONS:
-        video_files.extend(videos_path.glob(f"*{ext}"))
+    video_files = [
+        Path(entry.path)
+        for entry in os.scandir(VIDEOS_DIR)
+        if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS
+    ]
 
     logging.info(f"Found {len(video_files)} video files")
 
+    # fail before any expensive work, base names are used as keys everywhere
+    duplicates = [stem for stem, count in Counter(p.stem for p in video_files).items() if count > 1]
+    if duplicates:
+        raise ValueError(
+            "some videos have the same base name but different ending, this is not supported: "
+            + ", ".join(duplicates)
+        )
+
     return video_files
 
 
+def scan_covers():
+    """Index all existing cover files with a single read of the covers directory."""
+    _covers_index.clear()
+    if not os.path.isdir(COVERS_DIR):
+        return
+
+    for entry in os.scandir(COVERS_DIR):
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() in COVER_EXTENSIONS:
+            _covers_index[stem] = entry.name
+
+    logging.info(f"Found {len(_covers_index)} existing covers")
+
+
+def get_existing_cover(base_name: str) -> Optional[str]:
+    """Return the file name of the existing cover for the song or None."""
+    return _covers_index.get(base_name)
+
+
+def needs_update(
+    video_entry: Optional[Dict], no_internet: bool, mtime_ns: int
+) -> Tuple[bool, List[str]]:
+    """Check if a video entry is incomplete, also returns the reasons (for logging).
+
+    mtime_ns is the modification time of the video file, it is compared to the one stored when
+    the duration was determined.
+
+    """
+    if video_entry is None:
+        return True, ["new video"]
+
+    reasons = []
+    if "duration_seconds" not in video_entry:
+        reasons.append("missing duration")
+    elif video_entry.get("mtime_ns", mtime_ns) != mtime_ns:
+        reasons.append("video file changed")
+
+    if not no_internet:
+        if not video_entry.get("artist") or not video_entry.get("title"):
+            reasons.append("missing metadata")
+        if get_existing_cover(video_entry["filename"]) is None:
+            reasons.append("missing cover")
+
+    return bool(reasons), reasons
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_session() -> requests.Session:
+    """Return the HTTP session used for all cover downloads, keeps connections to the CDN open."""
+    session = requests.Session()
+    # covers are downloaded in worker threads, each of them needs its own connection
+    adapter = HTTPAdapter(pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 def download_cover(base_name: str, cover_url: str) -> Optional[str]:
     """Download cover art from the given URL if it does not already exist."""
-    full_path = Path(COVERS_DIR) / f"{base_name}.jpg"
-    if os.path.exists(full_path):
+    existing_cover = get_existing_cover(base_name)
+    if existing_cover:
         logging.info(f"Skipping download of cover {base_name} - already exists.")
-        return str(full_path), False
+        return str(_COVERS_PATH / existing_cover), False
 
-    # Create covers directory if it doesn't exist
-    Path(COVERS_DIR).mkdir(exist_ok=True)
+    full_path = _COVERS_PATH / f"{base_name}.jpg"
 
     logging.info(f"Downloading cover for: {base_name}...")
-    response = requests.get(cover_url)
-    response.raise_for_status()
+    # stream the image to disk instead of holding it in memory
+    with get_http_session().get(cover_url, timeout=COVER_DOWNLOAD_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        chunks = response.iter_content(chunk_size=COVER_CHUNK_SIZE)
+        first_chunk = next(chunks, b"")
 
-    # Detect the image type (e.g., 'jpeg', 'png')
-    ext = imghdr.what(None, h=response.content)
-    if not ext:
-        raise ValueError("Could not detect image type for: {cover_url}")
+        if not first_chunk:
+            raise ValueError(f"Empty response for cover: {cover_url}")
 
-    # Map 'jpeg' to 'jpg' for common file extension
-    ext = "jpg" if ext == "jpeg" else ext
+        # only JPG is supported, which is detected by its magic bytes
+        if not first_chunk.startswith(JPEG_MAGIC):
+            raise NotImplementedError("Cover art is not in JPG format, currently not supported")
 
-    if ext != "jpg":
-        raise NotImplementedError("Cover art is not in JPG format, currently not supported")
+        # an aborted download must not be taken for an existing cover in the next run
+        tmp_path = full_path.with_name(f"{full_path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(first_chunk)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, full_path)
 
-    with open(full_path, "wb") as f:
-        f.write(response.content)
+    _covers_index[base_name] = full_path.name
 
     logging.info(f"✓ Downloaded cover: {full_path}")
 
     return str(full_path), True
 
 
-def get_spotdl_metadata(search_query: str) -> Optional[Dict]:
-    """Get metadata from spotdl."""
-    logging.info(f'Getting metadata for: "{search_query}"')
+def load_spotdl_cache(refresh_negatives: bool = False):
+    """Load results of earlier spotdl queries from SPOTDL_CACHE_JSON.
 
-    try:
-        with tempfile.NamedTemporaryFile(mode="w+", suffix=".spotdl", delete=False) as temp_file:
-            temp_path = temp_file.name
-            temp_file.close()
-
-            # Use spotdl to get metadata
-            result = subprocess.run(
-                ["spotdl", "save", search_query, "--save-file", temp_path],
-                capture_output=False,
-                text=True,
-                timeout=150,
+    If refresh_negatives is set, queries without result are dropped and will be retried.
+
+    """
+    if os.path.exists(SPOTDL_CACHE_JSON):
+        cache = read_json(SPOTDL_CACHE_JSON)
+        if refresh_negatives:
+            cache = {query: entry for query, entry in cache.items() if "__miss__" not in entry}
+        _spotdl_cache.update(cache)
+        logging.info(f"✓ Loaded {len(_spotdl_cache)} cached spotdl results")
+
+
+def save_spotdl_cache():
+    """Save results of spotdl queries to SPOTDL_CACHE_JSON."""
+    write_json(SPOTDL_CACHE_JSON, _spotdl_cache, indent=False)
+
+
+def cache_spotdl_result(search_query: str, metadata_entry: Dict):
+    """Store the spotdl result of a search query in the cache (saved by main())."""
+    global _spotdl_cache_changed
+
+    _spotdl_cache[search_query] = metadata_entry
+    _spotdl_cache_changed = True
+
+
+def is_spotdl_cached(search_query: str) -> bool:
+    """Check if there is a (not yet expired) cached spotdl result for the search query."""
+    cached = _spotdl_cache.get(search_query)
+    if cached is None:
+        return False
+    return "__miss__" not in cached or time.time() - cached["__miss__"] < SPOTDL_NEGATIVE_CACHE_TTL
+
+
+def pause_spotdl(delay: float):
+    """Pause all spotdl queries for the given time (in seconds), e.g. when hitting a rate limit."""
+    global _spotdl_paused_until
+
+    paused_until = time.monotonic() + delay
+    if paused_until > _spotdl_paused_until:
+        logging.warning(f"Spotify rate limit reached, pausing all spotdl queries for {delay:.1f}s")
+        _spotdl_paused_until = paused_until
+
+
+async def throttle_spotdl():
+    """Wait until another spotdl process can be started without exceeding SPOTDL_MAX_RATE."""
+    while (wait := _spotdl_paused_until - time.monotonic()) > 0:
+        await asyncio.sleep(wait)
+
+    while len(_spotdl_starts) >= SPOTDL_MAX_RATE:
+        wait = _spotdl_starts[0] + 1.0 - time.monotonic()
+        if wait <= 0:
+            _spotdl_starts.popleft()
+        else:
+            await asyncio.sleep(wait)
+    _spotdl_starts.append(time.monotonic())
+
+
+def get_rate_limit_delay(output: bytes, attempt: int) -> Optional[float]:
+    """Return seconds to wait if spotdl hit the Spotify rate limit, None otherwise."""
+    if b"rate/request limit" not in output:
+        return None
+
+    match = re.search(rb"Retry will occur after: (\d+)", output)
+    if match:
+        return int(match.group(1)) + random.random()
+    return 2**attempt + random.random()
+
+
+async def read_spotdl_output(stream: asyncio.StreamReader) -> bytes:
+    """Read output of spotdl line by line and pause all queries as soon as a rate limit is hit.
+
+    The rate limit notice is a warning of spotipy, spotdl's log handler prints it to stdout.
+
+    """
+    lines = []
+    async for line in stream:
+        lines.append(line)
+        delay = get_rate_limit_delay(line, 0)
+        if delay is not None:
+            pause_spotdl(delay)
+    return b"".join(lines)
+
+
+async def run_spotdl_save(search_queries: List[str]) -> Optional[List[Dict]]:
+    """Run `spotdl save` for the search queries, return None if a song was not found.
+
+    Other spotdl failures (e.g. connection errors) raise RuntimeError, they must not be cached as
+    songs without result.
+
+    The results are not necessarily in the order of the queries, see match_spotdl_results(). If
+    Spotify's rate limit is hit, spotdl is retried with exponential backoff.
+
+    """
+    search_query = ", ".join(search_queries)
+
+    for attempt in range(SPOTDL_MAX_RETRIES + 1):
+        await throttle_spotdl()
+
+        # Use spotdl to get metadata
+        proc = await asyncio.create_subprocess_exec(
+            "spotdl",
+            "save",
+            *search_queries,
+            "--save-file",
+            "-",
+            "--threads",
+            "1",
+            # WARNING is needed to see spotipy's rate limit notice
+            "--log-level",
+            "WARNING",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # spotdl's log handler (rich) wraps lines at 80 columns if not writing to a terminal
+            env={**os.environ, "COLUMNS": "1000"},
+            limit=SPOTDL_OUTPUT_LINE_LIMIT,
+        )
+        try:
+            stdout, stderr, _ = await asyncio.wait_for(
+                asyncio.gather(
+                    read_spotdl_output(proc.stdout), read_spotdl_output(proc.stderr), proc.wait()
+                ),
+                timeout=150 * len(search_queries),
             )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+
+        if proc.returncode == 0:
+            break
+
+        delay = get_rate_limit_delay(stdout + stderr, attempt)
+        if delay is None:
+            break
+
+        if attempt == SPOTDL_MAX_RETRIES:
+            raise RuntimeError(f"spotdl rate limit still exceeded after {attempt} retries")
+
+        logging.warning(f"Retrying '{search_query}' after rate limit")
+        pause_spotdl(delay)
+
+    if proc.returncode != 0:
+        # spotdl exits with code 1 for any exception, SongError is the only one meaning not found
+        if b"No results found" in stdout or b"No results found" in stderr:
+            logging.info(f"spotdl found no results for '{search_query}'")
+            return None
+
+        # Log explicit error output
+        if stdout.strip():
+            logging.warning(f"  STDOUT: {stdout.decode(errors='replace').strip()}")
+        if stderr.strip():
+            logging.warning(f"  STDERR: {stderr.decode(errors='replace').strip()}")
+        raise RuntimeError(
+            f"spotdl failed for metadata '{search_query}' (exit code {proc.returncode})"
+        )
+
+    # spotdl prints the JSON list to stdout, possibly after log messages: the list starts at the
+    # last line beginning with "[" (nested lines are indented)
+    return json.loads(stdout[stdout.rfind(b"\n[") + 1 :])
 
-            # Log explicit error output
-            if result.returncode != 0:
-                logging.warning(
-                    f"spotdl failed for metadata '{search_query}' (exit code {result.returncode})"
-                )
-                if result.stdout.strip():
-                    logging.warning(f"  STDOUT: {result.stdout.strip()}")
-                if result.stderr.strip():
-                    logging.warning(f"  STDERR: {result.stderr.strip()}")
 
-                # Clean up temp file if it exists
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                return None
+@functools.lru_cache(maxsize=1)
+def get_spotify_client():
+    """Return spotdl's Spotify client, initialized once for all queries.
 
-            if result.returncode == 0 and os.path.exists(temp_path):
-                with open(temp_path, "r", encoding="utf-8") as f:
-                    metadata = json.load(f)
+    Returns None if the spotdl Python package is not available (e.g. if spotdl was installed with
+    pipx), the spotdl command line tool is used then.
 
-    except subprocess.TimeoutExpired:
+    """
+    try:
+        from spotdl.utils.config import DEFAULT_CONFIG, ConfigError, get_config
+        from spotdl.utils.spotify import SpotifyClient, SpotifyError
+    except ImportError:
+        logging.info("spotdl Python package not available, using the spotdl command line tool")
+        return None
+
+    # use the same credentials as the spotdl command line tool
+    config = dict(DEFAULT_CONFIG)
+    try:
+        config.update(get_config())
+    except ConfigError:
+        pass
+
+    try:
+        return SpotifyClient.init(
+            client_id=config["client_id"], client_secret=config["client_secret"]
+        )
+    except (SpotifyError, requests.RequestException, OSError) as e:
+        logging.warning(f"Could not initialize Spotify client, using spotdl command line tool: {e}")
+        return None
+
+
+def search_song(search_query: str) -> Optional[List[Dict]]:
+    """Search a song using spotdl in-process, same output as `spotdl save` (blocking)."""
+    from spotdl.types.song import Song, SongError
+    from spotipy.exceptions import SpotifyException
+
+    try:
+        return [Song.from_search_term(search_query).json]
+    except SongError:
+        return None
+    except SpotifyException as e:
+        raise RuntimeError(f"Spotify request failed: {e}") from e
+
+
+async def get_spotdl_metadata(search_query: str) -> Optional[Dict]:
+    """Get metadata from spotdl, results are cached across runs in SPOTDL_CACHE_JSON."""
+    if is_spotdl_cached(search_query):
+        cached = _spotdl_cache[search_query]
+        if "__miss__" in cached:
+            logging.info(f'Skipping "{search_query}" - no metadata found in a previous run')
+            return None
+        logging.info(f'✓ Using cached metadata for: "{search_query}"')
+        return cached
+
+    logging.info(f'Getting metadata for: "{search_query}"')
+
+    try:
+        if get_spotify_client() is not None:
+            await throttle_spotdl()
+            metadata = await asyncio.to_thread(search_song, search_query)
+        else:
+            metadata = await run_spotdl_save([search_query])
+
+    except asyncio.TimeoutError:
         logging.warning(f"✗ Timeout getting metadata for: {search_query}")
         return None
 
-    except Exception as e:
+    except (OSError, ValueError, RuntimeError, requests.RequestException) as e:
         logging.warning(f"✗ Error getting metadata for {search_query}: {e}")
         return None
 
+    if metadata is None:
+        # remember the failed query to avoid hammering Spotify on every run
+        cache_spotdl_result(search_query, {"__miss__": time.time()})
+        return None
+
     if len(metadata) != 1:
         raise ValueError("unexpected length of metadata:", len(metadata))
 
@@ -214,39 +624,172 @@ def get_spotdl_metadata(search_query: str) -> Optional[Dict]:
 
     if metadata:  # Check if metadata is not empty
         logging.info(f"✓ Retrieved metadata for: {search_query}")
+        cache_spotdl_result(search_query, metadata)
         return metadata
 
 
-def get_video_duration(video_path: Path) -> Optional[float]:
+def spotdl_result_matches(search_query: str, metadata_entry: Dict) -> bool:
+    """Check if song name and main artist of a spotdl result are contained in the search query."""
+    name = metadata_entry.get("name")
+    artist = metadata_entry.get("artist") or (metadata_entry.get("artists") or [None])[0]
+    if not name or not artist:
+        return False
+    search_query = search_query.lower()
+    return name.lower() in search_query and artist.lower() in search_query
+
+
+def match_spotdl_results(search_queries: List[str], metadata: List[Dict]) -> Dict[str, Dict]:
+    """Assign the results of a batched spotdl run to the search queries.
+
+    spotdl collects the songs with concurrent.futures.as_completed(), so the order of the results
+    may differ from the order of the queries. A result belongs to a query if song name and artist
+    are contained in the query (case-insensitive) and neither matches anything else. Ambiguous
+    queries are left out.
+
+    """
+    # indices of the matching results for each query
+    matches = [
+        [i for i, entry in enumerate(metadata) if spotdl_result_matches(search_query, entry)]
+        for search_query in search_queries
+    ]
+    matches_per_result = Counter(i for indices in matches for i in indices)
+
+    matched = {}
+    for search_query, indices in zip(search_queries, matches):
+        if len(indices) == 1 and matches_per_result[indices[0]] == 1:
+            matched[search_query] = metadata[indices[0]]
+    return matched
+
+
+async def batch_spotdl_metadata(
+    search_queries: List[str], num_workers: int = NUM_WORKERS
+) -> Dict[str, Dict]:
+    """Get metadata for many search queries using one spotdl process per SPOTDL_BATCH_SIZE queries.
+
+    Results are stored in the spotdl cache. spotdl silently drops songs which cannot be found or
+    fails for the whole batch. Songs of failed batches and songs whose result cannot be matched
+    are skipped, get_spotdl_metadata() will query them one by one later on.
+
+    """
+    results = {}
+    semaphore = asyncio.Semaphore(num_workers)
+
+    async def fetch_batch(batch: List[str]):
+        if len(batch) == 1:
+            # a failed batch of one would be queried again one by one, only a single query
+            # remembers songs which were not found
+            async with semaphore:
+                metadata_entry = await get_spotdl_metadata(batch[0])
+            if metadata_entry is not None:
+                results[batch[0]] = metadata_entry
+            return
+
+        async with semaphore:
+            logging.info(f"Getting metadata for {len(batch)} songs in one spotdl run...")
+            try:
+                metadata = await run_spotdl_save(batch)
+            except asyncio.TimeoutError:
+                logging.warning(f"✗ Timeout getting metadata for batch of {len(batch)} songs")
+                return
+            except (OSError, ValueError, RuntimeError) as e:
+                logging.warning(f"✗ Error getting metadata for batch of {len(batch)} songs: {e}")
+                return
+
+        if metadata is None:
+            return
+
+        matched = match_spotdl_results(batch, metadata)
+        if len(matched) < len(batch):
+            logging.warning(
+                f"Could not match spotdl results to {len(batch) - len(matched)} songs, falling "
+                "back to single queries"
+            )
+
+        for search_query, metadata_entry in matched.items():
+            cache_spotdl_result(search_query, metadata_entry)
+            results[search_query] = metadata_entry
+
+    async with asyncio.TaskGroup() as tg:
+        for i in range(0, len(search_queries), SPOTDL_BATCH_SIZE):
+            tg.create_task(fetch_batch(search_queries[i : i + SPOTDL_BATCH_SIZE]))
+
+    if results:
+        logging.info(f"✓ Retrieved metadata for {len(results)} songs in batches")
+
+    return results
+
+
+@functools.lru_cache(maxsize=1)
+def get_duration_executor() -> ProcessPoolExecutor:
+    """Return the process pool for PyAV, created on first use.
+
+    Parsing container headers needs the GIL, in a thread pool this would be serialized. Worker
+    processes are spawned instead of forked, because the event loop runs threads already.
+
+    """
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_video_duration_av(video_path: Path) -> Optional[float]:
+    """Get video duration in-process by reading the container header with PyAV (blocking)."""
+    with av.open(str(video_path)) as container:
+        if container.duration is None:
+            return None
+        return container.duration / av.time_base
+
+
+async def get_video_duration(video_path: Path, file_size: Optional[int] = None) -> Optional[float]:
+    """Get video duration using PyAV if installed, falls back to ffprobe."""
+    if file_size == 0:
+        raise ValueError(f"Video file {video_path} is empty")
+
+    if av is not None:
+        try:
+            duration = await asyncio.get_running_loop().run_in_executor(
+                get_duration_executor(), get_video_duration_av, video_path
+            )
+        except (av.error.FFmpegError, OSError) as e:
+            logging.debug(f"PyAV could not read {video_path}, using ffprobe: {e}")
+        else:
+            if duration is not None:
+                return duration
+
+    return await get_video_duration_ffprobe(video_path)
+
+
+async def get_video_duration_ffprobe(video_path: Path) -> Optional[float]:
     """Get video duration using ffprobe."""
-    result = subprocess.run(
-        [
-            "ffprobe",
-            "-v",
-            "quiet",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(video_path),
-        ],
-        capture_output=True,
-        check=True,
-        text=True,
+    cmd = [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-show_entries",
+        "format=duration",
+        "-print_format",
+        "json",
+        str(video_path),
+    ]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
     )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
 
-    if result.stdout.strip():
-        return float(result.stdout.strip())
-    else:
+    duration = json.loads(stdout).get("format", {}).get("duration")
+    if duration is None:
         raise ValueError(f"Could not retrieve duration of video {video_path} using ffprobe")
 
+    return float(duration)
 
-def process_video_file(
+
+async def process_video_file(
     video_path: Path,
     base_name: str,
     video_entry: dict = None,
     extra_metadata_entry: dict = None,
     no_internet: bool = False,
+    video_stat: Optional[os.stat_result] = None,
 ) -> Optional[Dict]:
     """Process a single video file.
 
@@ -255,7 +798,7 @@ def process_video_file(
     """
     t0 = time.time()
 
-    video_entry = {k: v for k, v in video_entry.items()} if video_entry else {}
+    video_entry = dict(video_entry) if video_entry else {}
 
     result = {
         "cover_downloaded": False,
@@ -267,10 +810,14 @@ def process_video_file(
     if "filename" not in video_entry:
         video_entry["filename"] = base_name
 
-    # Get video duration
-    if "duration_seconds" not in video_entry:
-        duration = get_video_duration(video_path)
+    # Get video duration, skipped if known and the video file is unchanged
+    if video_stat is None:
+        video_stat = video_path.stat()
+    mtime_ns = video_stat.st_mtime_ns
+    if "duration_seconds" not in video_entry or video_entry.get("mtime_ns", mtime_ns) != mtime_ns:
+        duration = await get_video_duration(video_path, video_stat.st_size)
         video_entry["duration_seconds"] = round(duration, 2)
+        video_entry["mtime_ns"] = mtime_ns
 
     if no_internet:
         return result
@@ -279,7 +826,7 @@ def process_video_file(
 
     # Get metadata from spotdl
     if extra_metadata_entry is None:
-        extra_metadata_entry = get_spotdl_metadata(base_name)
+        extra_metadata_entry = await get_spotdl_metadata(base_name)
 
     if not extra_metadata_entry:
         logging.warning(f"Skipping {video_path.name} - no metadata available")
@@ -299,7 +846,10 @@ def process_video_file(
         logging.warning(f"Skipping Cover download for {video_path.name} - no cover available")
         return result
 
-    cover_filename, cover_downloaded = download_cover(base_name, extra_metadata_entry["cover_url"])
+    # requests is blocking, run the download in a worker thread to keep the event loop responsive
+    cover_filename, cover_downloaded = await asyncio.to_thread(
+        download_cover, base_name, extra_metadata_entry["cover_url"]
+    )
     result["cover_downloaded"] = cover_downloaded
 
     # Add optional fields only if they have valid values
@@ -321,9 +871,7 @@ def process_video_file(
     if cover_filename and cover_filename != f"{COVERS_DIR}/{base_name}.jpg":
         video_entry["cover_filename"] = cover_filename
 
-    video_entry["processed_at"] = subprocess.run(
-        ["date", "-u", "+%Y-%m-%dT%H:%M:%SZ"], capture_output=True, text=True
-    ).stdout.strip()
+    video_entry["processed_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
     logging.info(f"Total processing duration: {time.time() - t0}")
 
@@ -340,16 +888,38 @@ def main():
         action="store_true",
         help="Skip network operations - only add filename and duration of videos",
     )
+    parser.add_argument(
+        "--assume-internet",
+        action="store_true",
+        help="Skip the check for an internet connection at startup",
+    )
+    parser.add_argument(
+        "--refresh-negatives",
+        action="store_true",
+        help="Retry songs for which spotdl did not find anything in previous runs",
+    )
+    parser.add_argument(
+        "-j",
+        "--num-workers",
+        type=int,
+        default=NUM_WORKERS,
+        help=f"Number of videos processed in parallel (default: {NUM_WORKERS})",
+    )
     args = parser.parse_args()
+    if args.num_workers < 1:
+        parser.error("--num-workers must be at least 1")
 
     setup_logging()
 
     if args.verbose:
         logging.getlogging().setLevel(logging.DEBUG)
 
+    if not check_dependencies(args.no_internet):
+        return 1
+
     # Check internet connectivity unless explicitly running in offline mode
     has_internet = True
-    if not args.no_internet:
+    if not args.no_internet and not args.assume_internet:
         has_internet = check_internet_connection()
         if not has_internet:
             logging.warning("⚠️  No internet connection detected!")
@@ -358,11 +928,15 @@ def main():
                 "duration only"
             )
             return 1
+    elif not args.no_internet:
+        logging.info("Skipping internet connection check")
     else:
         logging.info("Running in offline mode - skipping network operations")
 
     # Load existing data
-    videos_list, extra_metadata = load_existing_data()
+    # extra metadata is not used offline, unless the results of an interrupted run are restored
+    with_extra_metadata = not args.no_internet or os.path.exists(PROGRESS_JSONL)
+    videos_list, extra_metadata = load_existing_data(with_extra_metadata)
 
     # Get video files from file system
     video_files = get_video_files()
@@ -372,21 +946,23 @@ def main():
 
     # Create covers directory
     if not args.no_internet:
-        Path(COVERS_DIR).mkdir(exist_ok=True)
+        _COVERS_PATH.mkdir(exist_ok=True, parents=True)
+        scan_covers()
+        load_spotdl_cache(args.refresh_negatives)
 
     # Build a map of existing video entries by filename
-    video_data = {entry["filename"]: entry for entry in videos_list}
-
-    if len(video_data) < len(videos_list):
-        raise ValueError(
-            "some videos have the same base name but different ending, this is not supported"
-        )
+    video_data = {}
+    for entry in videos_list:
+        if entry["filename"] in video_data:
+            raise ValueError(
+                "some videos have the same base name but different ending, this is not "
+                f"supported: {entry['filename']}"
+            )
+        video_data[entry["filename"]] = entry
 
-    missing_video_files = [
-        video
-        for video, data in video_data.items()
-        if not os.path.exists(f"{VIDEOS_DIR}/{video}.mp4")
-    ]
+    # compare with the directory listing instead of checking each file on disk
+    video_stems = {video_path.stem for video_path in video_files}
+    missing_video_files = [video for video in video_data if video not in video_stems]
     if missing_video_files:
         raise RuntimeError(
             "Missing video files, please remove from videos.json: "
@@ -394,50 +970,136 @@ def main():
         )
     logging.info("Found all {len(video_data)} video files listed in the videos.json.")
 
-    # Process each video file
+    # number of entries which differ from the JSON files on disk
+    changed_count = replay_progress(video_data, extra_metadata, video_stems)
+
+    # Process video files concurrently
     processed_count = 0
     metadata_downloaded_count = 0
     cover_downloaded_count = 0
 
-    last_save = time.time()
+    # results are appended to the progress file, json files are written once at the end
+    progress_file = open(PROGRESS_JSONL, "a", encoding="utf-8")
 
-    try:
-        for video_path in video_files:
-            print("\n")
-            logging.info(f"Processing: {video_path.name}...")
+    async def process_and_store(
+        video_path: Path,
+        video_stat: os.stat_result,
+        reasons: List[str],
+        semaphore: asyncio.Semaphore,
+    ):
+        nonlocal processed_count, changed_count, metadata_downloaded_count, cover_downloaded_count
+
+        base_name = video_path.stem
 
-            base_name = video_path.stem
+        async with semaphore:
+            print("\n")
+            logging.info(f"Processing: {video_path.name} ({', '.join(reasons)})...")
 
-            result = process_video_file(
+            result = await process_video_file(
                 video_path,
                 base_name,
                 video_data.get(base_name),
                 extra_metadata.get(base_name),
                 args.no_internet,
+                video_stat,
             )
 
-            cover_downloaded_count += result["cover_downloaded"]
-            metadata_downloaded_count += result["metadata_downloaded"]
+        cover_downloaded_count += result["cover_downloaded"]
+        metadata_downloaded_count += result["metadata_downloaded"]
+
+        # only new extra metadata is appended to the progress file, known entries are in the
+        # extra metadata JSON file already
+        new_extra_metadata_entry = result.get("extra_metadata_entry")
+        if new_extra_metadata_entry is extra_metadata.get(base_name):
+            new_extra_metadata_entry = None
+
+        processed_count += 1
 
-            video_data[base_name] = result["video_entry"]
-            if "extra_metadata_entry" in result:
-                extra_metadata[base_name] = result["extra_metadata_entry"]
+        # e.g. spotdl still finds nothing for a song without metadata
+        if result["video_entry"] == video_data.get(base_name) and new_extra_metadata_entry is None:
+            return
 
-            processed_count += 1
+        # no lock needed: tasks run on a single event loop thread
+        video_data[base_name] = result["video_entry"]
+        if new_extra_metadata_entry is not None:
+            extra_metadata[base_name] = new_extra_metadata_entry
 
-            # save json files every 60s for resume capability
-            if time.time() - last_save > 60:
-                save_json_files(video_data, extra_metadata)
-                last_save = time.time()
+        append_progress(progress_file, base_name, result["video_entry"], new_extra_metadata_entry)
+
+        changed_count += 1
+
+    async def process_all():
+        nonlocal changed_count
+
+        # blocking work (cover downloads) runs in a thread pool, bounded like the video tasks
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=args.num_workers, thread_name_prefix="update-song-data")
+        )
+
+        # complete videos are skipped right away, without any subprocess or task
+        videos_to_update = []
+        for video_path in video_files:
+            # stat each video only once, the result is passed on to process_video_file()
+            video_stat = video_path.stat()
+            video_entry = video_data.get(video_path.stem)
+            if (
+                video_entry is not None
+                and "duration_seconds" in video_entry
+                and "mtime_ns" not in video_entry
+            ):
+                # entries from before mtime_ns was stored: the duration is trusted, but later
+                # changes of the video file are detected from now on
+                video_entry["mtime_ns"] = video_stat.st_mtime_ns
+                changed_count += 1
+
+            update, reasons = needs_update(video_entry, args.no_internet, video_stat.st_mtime_ns)
+            if update:
+                videos_to_update.append((video_path, video_stat, reasons))
+        logging.info(f"Skipping {len(video_files) - len(videos_to_update)} up to date videos")
+
+        if not args.no_internet and get_spotify_client() is None:
+            # query metadata of all new songs with a few spotdl processes instead of one per song
+            await batch_spotdl_metadata(
+                [
+                    video_path.stem
+                    for video_path, _, _ in videos_to_update
+                    if video_path.stem not in extra_metadata
+                    and not is_spotdl_cached(video_path.stem)
+                ],
+                args.num_workers,
+            )
+
+        semaphore = asyncio.Semaphore(args.num_workers)
+        async with asyncio.TaskGroup() as tg:
+            for video_path, video_stat, reasons in videos_to_update:
+                tg.create_task(process_and_store(video_path, video_stat, reasons, semaphore))
+
+    try:
+        asyncio.run(process_all())
 
     finally:
-        save_json_files(video_data, extra_metadata)
+        progress_file.close()
+        if changed_count:
+            save_json_files(video_data, extra_metadata if with_extra_metadata else None)
+        # saved once instead of after each query, found metadata is in the progress file anyway
+        if _spotdl_cache_changed:
+            save_spotdl_cache()
+        os.remove(PROGRESS_JSONL)
 
         logging.info(f"Videos processed: {processed_count}")
         logging.info(f"Number of songs where metadata was retrieved: {metadata_downloaded_count}")
         logging.info(f"Covers downloaded: {cover_downloaded_count}")
+        if not args.no_internet:
+            cover_count = sum(1 for base_name in video_data if base_name in _covers_index)
+            logging.info(f"Songs with cover: {cover_count}/{len(video_data)}")
 
-        logging.info(f"JSON files saved: {OUTPUT_JSON}, {EXTRA_METADATA_JSON}")
+        if changed_count:
+            saved_files = (
+                [OUTPUT_JSON, EXTRA_METADATA_JSON] if with_extra_metadata else [OUTPUT_JSON]
+            )
+            logging.info(f"JSON files saved: {', '.join(saved_files)}")
+        else:
+            logging.info(f"Nothing changed, {OUTPUT_JSON} and {EXTRA_METADATA_JSON} not rewritten")
 
     return 0
 